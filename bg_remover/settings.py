@@ -183,6 +183,11 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # For production, you might want to use cloud storage for media files
 # For now, we'll use local storage with periodic cleanup
 
+# When served behind nginx, hand media transfers off to it with X-Accel-Redirect
+# instead of streaming the bytes through Django. Set to the internal location
+# that aliases MEDIA_ROOT (e.g. '/internal_media/'); leave empty to serve via Django.
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='')
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024   # 25MB
@@ -195,6 +200,18 @@ CONN_MAX_AGE = 0  # Don't persist connections
 # No API key required - using local Python libraries
 BACKGROUND_REMOVAL_METHOD = config('BACKGROUND_REMOVAL_METHOD', default='auto')  # auto, rembg, opencv, pillow
 
+# Custom u2net ONNX model for rembg, e.g. the INT8 model written by
+# `python manage.py quantize_model`. Empty uses rembg's default FP32 u2net.
+REMBG_MODEL_PATH = config('REMBG_MODEL_PATH', default='')
+
+# Directory for TensorRT engines built on GPU hosts with a TensorRT-enabled
+# onnxruntime, so they are not rebuilt on every start. Empty disables caching.
+ONNX_TRT_ENGINE_CACHE_PATH = config('ONNX_TRT_ENGINE_CACHE_PATH', default='')
+
+# Queue uploads for the `process_images` worker command instead of processing
+# them inside the web request. Requires a worker process to be running.
+BACKGROUND_REMOVAL_WORKER = config('BACKGROUND_REMOVAL_WORKER', default=False, cast=bool)
+
 # Session settings for temporary file storage
 SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
@@ -18,15 +18,56 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import Http404
-from django.views.static import serve
+from django.http import FileResponse, Http404, HttpResponse
 import os
+from urllib.parse import quote
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('remover.urls')),
 ]
 
+def protected_media_serve(request, path, document_root=None, show_indexes=False):
+    """Serve media files in production with some basic protection"""
+    # You can add authentication/authorization here if needed
+    # For now, we'll serve files directly but this can be enhanced
+    
+    # Ensure the file is in the media directory, after resolving ".." and
+    # symlinks. document_root is already resolved, so the containment
+    # check is a prefix comparison.
+    try:
+        full_path = os.path.realpath(os.path.join(document_root, path))
+    except ValueError:
+        # e.g. an embedded null byte from /media/%00
+        raise Http404("Media file not found")
+    if not full_path.startswith(document_root + os.sep):
+        raise Http404("Media file not found")
+    
+    # Let the front-end server send the file with sendfile(2)
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx would answer a directory or missing file with its own error
+        if not os.path.isfile(full_path):
+            raise Http404("Media file not found")
+        
+        # Use the resolved path that passed the check, not the raw request
+        # path, so the header never carries ".." segments
+        relative_path = os.path.relpath(full_path, document_root)
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(relative_path)
+        # Leave the content type for nginx to fill in from the file
+        del response['Content-Type']
+        return response
+    
+    # A plain binary file handed to FileResponse goes out through the WSGI
+    # server's file_wrapper, which gunicorn sends with sendfile(2)
+    try:
+        media_file = open(full_path, 'rb')
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError):
+        raise Http404("Media file not found")
+    
+    return FileResponse(media_file)
+
+
 # Serve media files
 if settings.DEBUG:
     # Development: serve media files with Django
@@ -34,21 +75,13 @@ if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 else:
     # Production: serve media files with custom view for better control
-    def protected_media_serve(request, path, document_root=None, show_indexes=False):
-        """Serve media files in production with some basic protection"""
-        # You can add authentication/authorization here if needed
-        # For now, we'll serve files directly but this can be enhanced
-        
-        # Ensure the file exists and is in the media directory
-        full_path = os.path.join(document_root, path)
-        if not os.path.exists(full_path) or not full_path.startswith(document_root):
-            raise Http404("Media file not found")
-            
-        return serve(request, path, document_root, show_indexes)
+    # Resolved once at startup rather than on every request
+    _MEDIA_URL_PREFIX = settings.MEDIA_URL.lstrip('/')
+    _MEDIA_ROOT_REAL = os.path.realpath(settings.MEDIA_ROOT)
     
     # Add media URL pattern for production
     urlpatterns += [
-        path(settings.MEDIA_URL.lstrip('/') + '<path:path>', protected_media_serve, {
-            'document_root': settings.MEDIA_ROOT,
+        path(_MEDIA_URL_PREFIX + '<path:path>', protected_media_serve, {
+            'document_root': _MEDIA_ROOT_REAL,
         }),
     ]
@@ -10,6 +10,14 @@ echo "Installing Python dependencies..."
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Optional: swap Pillow for the AVX2 build of Pillow-SIMD (needs a compiler
+# plus the libjpeg-turbo, zlib and libwebp headers on the build image)
+if [ "$USE_PILLOW_SIMD" = "True" ]; then
+    echo "Installing Pillow-SIMD..."
+    pip uninstall -y pillow
+    CC="cc -mavx2" pip install --no-cache-dir --no-binary :all: --force-reinstall pillow-simd
+fi
+
 echo "Collecting static files..."
 python manage.py collectstatic --no-input
 
@@ -6,11 +6,12 @@ Provides easy commands for development, deployment, and maintenance.
 
 import os
 import sys
-import subprocess
-import argparse
 
 def run_command(command, description=None):
     """Run a shell command with error handling"""
+    # Imported here so scripts that only need setup_django stay light
+    import subprocess
+    
     if description:
         print(f"🔧 {description}...")
     
@@ -26,18 +27,45 @@ def run_command(command, description=None):
             print(e.stderr)
         return False
 
+def setup_django():
+    """Configure Django once so management commands can run in-process"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bg_remover.settings')
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+def run_management_command(name, *args, description=None, **options):
+    """Run a Django management command in this process with error handling"""
+    if description:
+        print(f"🔧 {description}...")
+    
+    try:
+        setup_django()
+        from django.core.management import call_command
+        call_command(name, *args, **options)
+        return True
+    except (Exception, SystemExit) as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def setup_project():
     """Initial project setup"""
     print("🚀 Setting up AI Background Remover project...")
     
+    # Dependencies have to be installed before Django can be imported
+    description = "Installing dependencies"
+    if not run_command(f'"{sys.executable}" -m pip install -r requirements.txt', description):
+        print(f"❌ Setup failed at: {description}")
+        return False
+    
     commands = [
-        ("pip install -r requirements.txt", "Installing dependencies"),
-        ("python manage.py makemigrations", "Creating database migrations"),
-        ("python manage.py migrate", "Applying database migrations"),
+        ("makemigrations", "Creating database migrations"),
+        ("migrate", "Applying database migrations"),
     ]
     
     for command, description in commands:
-        if not run_command(command, description):
+        if not run_management_command(command, description=description):
             print(f"❌ Setup failed at: {description}")
             return False
     
@@ -50,39 +78,38 @@ def setup_project():
 def start_server(host="127.0.0.1", port=8000):
     """Start the development server"""
     print(f"🌐 Starting development server at http://{host}:{port}")
-    command = f"python manage.py runserver {host}:{port}"
-    os.system(command)  # Use os.system for interactive mode
+    run_management_command('runserver', f"{host}:{port}")
 
 def create_superuser():
     """Create Django superuser"""
     print("👤 Creating Django superuser...")
-    os.system("python manage.py createsuperuser")
+    run_management_command('createsuperuser')
 
 def collect_static():
     """Collect static files for production"""
-    return run_command("python manage.py collectstatic --noinput", 
-                      "Collecting static files")
+    return run_management_command('collectstatic', interactive=False,
+                                  description="Collecting static files")
 
-def cleanup_files(dry_run=False, hours=24):
+def cleanup_files(dry_run=False, hours=None):
     """Clean up expired files"""
-    command = f"python manage.py cleanup_files --hours {hours}"
-    if dry_run:
-        command += " --dry-run"
-    
-    description = f"Cleaning up files older than {hours} hours"
+    if hours is None:
+        description = "Cleaning up expired files"
+    else:
+        description = f"Cleaning up files older than {hours} hours"
     if dry_run:
         description += " (dry run)"
     
-    return run_command(command, description)
+    return run_management_command('cleanup_files', hours=hours, dry_run=dry_run,
+                                  description=description)
 
 def run_tests():
     """Run Django tests"""
-    return run_command("python manage.py test", "Running tests")
+    return run_management_command('test', description="Running tests")
 
 def check_deployment():
     """Run deployment checks"""
-    return run_command("python manage.py check --deploy", 
-                      "Running deployment checks")
+    return run_management_command('check', deploy=True,
+                                  description="Running deployment checks")
 
 def backup_database():
     """Create database backup"""
@@ -90,8 +117,9 @@ def backup_database():
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_file = f"backup_db_{timestamp}.json"
     
-    return run_command(f"python manage.py dumpdata > {backup_file}", 
-                      f"Creating database backup: {backup_file}")
+    with open(backup_file, 'w') as f:
+        return run_management_command('dumpdata', stdout=f,
+                                      description=f"Creating database backup: {backup_file}")
 
 def show_status():
     """Show application status"""
@@ -107,26 +135,27 @@ def show_status():
     
     # Check database
     try:
-        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bg_remover.settings')
-        import django
-        django.setup()
+        setup_django()
         
+        from django.db.models import Count, Q
+        from django.utils import timezone
         from remover.models import ImageProcessing
-        total_count = ImageProcessing.objects.count()
-        completed_count = ImageProcessing.objects.filter(status='completed').count()
-        pending_count = ImageProcessing.objects.filter(status='pending').count()
+        
+        # One conditional aggregate instead of a COUNT query per statistic
+        stats = ImageProcessing.objects.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            pending=Count('id', filter=Q(status='pending')),
+            expired=Count('id', filter=Q(expires_at__lte=timezone.now())),
+        )
         
         print(f"📈 Database stats:")
-        print(f"   Total processings: {total_count}")
-        print(f"   Completed: {completed_count}")
-        print(f"   Pending: {pending_count}")
+        print(f"   Total processings: {stats['total']}")
+        print(f"   Completed: {stats['completed']}")
+        print(f"   Pending: {stats['pending']}")
         
         # Check expired files
-        from django.utils import timezone
-        cutoff_time = timezone.now() - timezone.timedelta(hours=24)
-        expired_count = ImageProcessing.objects.filter(
-            created_at__lt=cutoff_time
-        ).count()
+        expired_count = stats['expired']
         
         if expired_count > 0:
             print(f"🗑️  Files needing cleanup: {expired_count}")
@@ -137,6 +166,8 @@ def show_status():
         print(f"❌ Database check failed: {e}")
 
 def main():
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="AI Background Remover - Management Script"
     )
@@ -161,8 +192,9 @@ def main():
     cleanup_parser = subparsers.add_parser('cleanup', help='Clean up expired files')
     cleanup_parser.add_argument('--dry-run', action='store_true', 
                                help='Show what would be deleted')
-    cleanup_parser.add_argument('--hours', type=int, default=24, 
-                               help='Delete files older than this many hours')
+    cleanup_parser.add_argument('--hours', type=int, default=None, 
+                               help='Delete files older than this many hours '
+                                    '(default: records past their expiry time)')
     
     # Test command
     subparsers.add_parser('test', help='Run tests')
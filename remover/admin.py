@@ -1,20 +1,22 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import ImageProcessing
+from .utils import delete_files
 
 
 @admin.register(ImageProcessing)
 class ImageProcessingAdmin(admin.ModelAdmin):
     list_display = [
         'id', 'status', 'created_at', 'processed_at', 
-        'original_size_display', 'processing_time_display', 'thumbnail_display'
+        'display_size', 'display_duration', 'thumbnail_display'
     ]
     list_filter = ['status', 'created_at', 'processed_at']
     search_fields = ['id']
     readonly_fields = [
-        'id', 'created_at', 'updated_at', 'processed_at',
+        'id', 'created_at', 'updated_at', 'processed_at', 'expires_at',
         'original_width', 'original_height', 'original_size',
         'processing_duration', 'thumbnail_display', 'processed_thumbnail_display'
     ]
@@ -37,24 +39,11 @@ class ImageProcessingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at', 'processed_at'),
+            'fields': ('created_at', 'updated_at', 'processed_at', 'expires_at'),
             'classes': ('collapse',)
         }),
     )
     
-    def original_size_display(self, obj):
-        if obj.original_width and obj.original_height:
-            return f"{obj.original_width}×{obj.original_height}px"
-        return "Unknown"
-    original_size_display.short_description = "Size"
-    
-    def processing_time_display(self, obj):
-        duration = obj.processing_duration
-        if duration:
-            return f"{duration:.1f}s"
-        return "N/A"
-    processing_time_display.short_description = "Processing Time"
-    
     def thumbnail_display(self, obj):
         if obj.original_image:
             return format_html(
@@ -89,23 +78,31 @@ class ImageProcessingAdmin(admin.ModelAdmin):
     
     def cleanup_files(self, request, queryset):
         """Custom admin action to clean up selected files"""
-        deleted_files = 0
-        for processing in queryset:
-            try:
-                processing.cleanup_files()
-                processing.delete()
-                deleted_files += 1
-            except Exception as e:
+        rows = list(queryset.values_list('id', 'original_image', 'processed_image'))
+        
+        # Delete all files concurrently, then the records in one query
+        file_paths = [
+            default_storage.path(name)
+            for _, original_name, processed_name in rows
+            for name in (original_name, processed_name)
+            if name
+        ]
+        for file_path, deleted, error in delete_files(file_paths):
+            if error:
                 self.message_user(
                     request,
-                    f"Error deleting {processing.id}: {e}",
+                    f"Error deleting {file_path}: {error}",
                     level='ERROR'
                 )
         
-        if deleted_files:
+        deleted_records, _ = ImageProcessing.objects.filter(
+            id__in=[row[0] for row in rows]
+        ).delete()
+        
+        if deleted_records:
             self.message_user(
                 request,
-                f"Successfully cleaned up {deleted_files} processing record(s)",
+                f"Successfully cleaned up {deleted_records} processing record(s)",
                 level='SUCCESS'
             )
     
@@ -1,9 +1,44 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from PIL import Image
 import os
 
-from .models import ImageProcessing
+from .models import ImageProcessing, read_image_dimensions
+
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+MIN_IMAGE_DIMENSION = 50
+MAX_IMAGE_DIMENSION = 6000
+
+# JPEG headers can sit behind EXIF and ICC segments; give up after this much
+HEADER_PEEK_BYTES = 256 * 1024
+
+
+def check_image_dimensions(width, height):
+    """Raise ValidationError for images outside the accepted size range"""
+    if width < MIN_IMAGE_DIMENSION or height < MIN_IMAGE_DIMENSION:
+        raise ValidationError('Image is too small. Minimum size is 50x50 pixels.')
+    
+    # Maximum dimensions (increased for high-res support)
+    if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+        raise ValidationError('Image is too large. Maximum size is 6000x6000 pixels.')
+
+
+class HeaderCheckedImageField(forms.ImageField):
+    """ImageField that rejects out-of-range dimensions before PIL's verify pass"""
+    
+    def to_python(self, data):
+        if data:
+            # The header is enough to reject an oversized image, so a
+            # decompression bomb never reaches Image.verify()
+            try:
+                dimensions = read_image_dimensions(data, max_bytes=HEADER_PEEK_BYTES)
+            except Exception:
+                # Leave unreadable files for ImageField to report
+                dimensions = None
+            data.seek(0)
+            if dimensions:
+                check_image_dimensions(*dimensions)
+        
+        return super().to_python(data)
 
 
 class ImageUploadForm(forms.ModelForm):
@@ -12,6 +47,9 @@ class ImageUploadForm(forms.ModelForm):
     class Meta:
         model = ImageProcessing
         fields = ['original_image']
+        field_classes = {
+            'original_image': HeaderCheckedImageField,
+        }
         widgets = {
             'original_image': forms.FileInput(attrs={
                 'class': 'hidden',
@@ -37,36 +75,19 @@ class ImageUploadForm(forms.ModelForm):
         if image.size > 25 * 1024 * 1024:
             raise ValidationError('Image file too large. Please select a file under 25MB.')
         
-        # Check file type
-        allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
-        if image.content_type not in allowed_types:
+        # forms.ImageField has already opened and verified the upload with
+        # PIL and left the image on the file; reuse it instead of reopening
+        img = image.image
+        width, height = img.size
+        
+        # Check file type from the format PIL detected in the file itself
+        if img.format not in ALLOWED_IMAGE_FORMATS:
             raise ValidationError(
                 'Unsupported file type. Please upload a JPG, PNG, or WebP image.'
             )
         
-        # Validate image using PIL
-        try:
-            img = Image.open(image)
-            img.verify()  # Verify it's a valid image
-            
-            # Reset file pointer after verification
-            image.seek(0)
-            
-            # Check minimum dimensions
-            img = Image.open(image)
-            width, height = img.size
-            if width < 50 or height < 50:
-                raise ValidationError('Image is too small. Minimum size is 50x50 pixels.')
-            
-            # Check maximum dimensions (increased for high-res support)
-            if width > 6000 or height > 6000:
-                raise ValidationError('Image is too large. Maximum size is 6000x6000 pixels.')
-            
-            # Reset file pointer again
-            image.seek(0)
-            
-        except Exception as e:
-            raise ValidationError(f'Invalid image file: {str(e)}')
+        # Check dimensions again in case the header peek gave up
+        check_image_dimensions(width, height)
         
         return image
 
@@ -1,7 +1,18 @@
 import os
+import time
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, transaction
 from django.utils import timezone
 from remover.models import ImageProcessing
+from remover.utils import OutputBuffer, delete_files
+
+# Upper bound on how long --watch sleeps, so new uploads with a shorter
+# retention are still picked up promptly
+WATCH_MAX_SLEEP = 3600
+
+# How long --watch waits before retrying after a database error
+WATCH_RETRY_DELAY = 30
 
 
 class Command(BaseCommand):
@@ -16,21 +27,89 @@ class Command(BaseCommand):
         parser.add_argument(
             '--hours',
             type=int,
-            default=24,
-            help='Delete files older than this many hours (default: 24)',
+            default=None,
+            help='Delete files older than this many hours (default: records past their expiry time)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of records deleted per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running, sleeping until the next record expires',
         )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         hours = options['hours']
+        batch_size = options['batch_size']
         
-        self.stdout.write(f"Looking for files older than {hours} hours...")
+        if options['watch'] and not dry_run:
+            self._watch(hours, batch_size)
+        else:
+            self._cleanup_expired(hours, batch_size, dry_run)
+    
+    def _expired_queryset(self, hours):
+        """Records due for cleanup, oldest first"""
+        if hours is None:
+            # Range scan over the indexed expiry column
+            return ImageProcessing.objects.filter(
+                expires_at__lte=timezone.now()
+            ).order_by('expires_at')
         
-        # Find expired processing records
         cutoff_time = timezone.now() - timezone.timedelta(hours=hours)
-        expired_processings = ImageProcessing.objects.filter(
+        return ImageProcessing.objects.filter(
             created_at__lt=cutoff_time
-        )
+        ).order_by('created_at')
+    
+    def _next_expiry(self, hours):
+        """When the next record becomes due for cleanup, or None if there are none"""
+        if hours is None:
+            return ImageProcessing.objects.filter(
+                expires_at__gt=timezone.now()
+            ).order_by('expires_at').values_list('expires_at', flat=True).first()
+        
+        oldest = ImageProcessing.objects.order_by('created_at').values_list(
+            'created_at', flat=True
+        ).first()
+        return oldest + timezone.timedelta(hours=hours) if oldest else None
+    
+    def _watch(self, hours, batch_size):
+        """Clean up records as they expire instead of rescanning on a schedule"""
+        while True:
+            # Drop connections the database closed (restart, idle timeout)
+            # or that outlived CONN_MAX_AGE, as Django does per request
+            close_old_connections()
+            
+            try:
+                self._cleanup_expired(hours, batch_size, dry_run=False)
+                next_expiry = self._next_expiry(hours)
+            except DatabaseError as e:
+                # Keep watching; the next iteration reconnects
+                self.stdout.write(self.style.ERROR(f"Database error: {e}"))
+                time.sleep(WATCH_RETRY_DELAY)
+                continue
+            
+            if next_expiry:
+                delay = (next_expiry - timezone.now()).total_seconds()
+            else:
+                delay = WATCH_MAX_SLEEP
+            delay = min(max(delay, 1), WATCH_MAX_SLEEP)
+            
+            self.stdout.write(f"Sleeping {delay:.0f}s until the next expiry...")
+            time.sleep(delay)
+    
+    def _cleanup_expired(self, hours, batch_size, dry_run):
+        if hours is None:
+            self.stdout.write("Looking for expired files...")
+        else:
+            self.stdout.write(f"Looking for files older than {hours} hours...")
+        
+        # Find expired processing records
+        expired_processings = self._expired_queryset(hours)
         
         count = expired_processings.count()
         self.stdout.write(f"Found {count} expired processing record(s)")
@@ -42,39 +121,32 @@ class Command(BaseCommand):
         deleted_files = 0
         deleted_records = 0
         
-        for processing in expired_processings:
-            if dry_run:
-                self.stdout.write(f"Would delete: {processing.id} (created: {processing.created_at})")
-                if processing.original_image:
-                    self.stdout.write(f"  - Original: {processing.original_image.path}")
-                if processing.processed_image:
-                    self.stdout.write(f"  - Processed: {processing.processed_image.path}")
-            else:
-                # Clean up files
-                try:
-                    if processing.original_image and os.path.exists(processing.original_image.path):
-                        os.remove(processing.original_image.path)
-                        deleted_files += 1
-                        self.stdout.write(f"Deleted original: {processing.original_image.path}")
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.WARNING(f"Failed to delete original file: {e}")
-                    )
+        if dry_run:
+            with OutputBuffer(self.stdout, flush_every=batch_size) as out:
+                for processing in expired_processings.only(
+                    'id', 'created_at', 'original_image', 'processed_image'
+                ).iterator(chunk_size=batch_size):
+                    out.write(f"Would delete: {processing.id} (created: {processing.created_at})")
+                    if processing.original_image:
+                        out.write(f"  - Original: {processing.original_image.path}")
+                    if processing.processed_image:
+                        out.write(f"  - Processed: {processing.processed_image.path}")
+        else:
+            while True:
+                # Collect ids and file names up front so each batch of records
+                # can be removed with a single DELETE instead of one query per row
+                rows = list(
+                    expired_processings.values_list('id', 'original_image', 'processed_image')[:batch_size]
+                )
+                if not rows:
+                    break
                 
-                try:
-                    if processing.processed_image and os.path.exists(processing.processed_image.path):
-                        os.remove(processing.processed_image.path)
-                        deleted_files += 1
-                        self.stdout.write(f"Deleted processed: {processing.processed_image.path}")
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.WARNING(f"Failed to delete processed file: {e}")
-                    )
+                batch_files, batch_records = self._delete_batch(rows)
+                deleted_files += batch_files
+                deleted_records += batch_records
                 
-                # Delete database record
-                processing.delete()
-                deleted_records += 1
-                self.stdout.write(f"Deleted record: {processing.id}")
+                if len(rows) < batch_size:
+                    break
         
         if dry_run:
             self.stdout.write(
@@ -92,6 +164,38 @@ class Command(BaseCommand):
         # Clean up empty directories
         self._cleanup_empty_dirs(dry_run)
     
+    def _delete_batch(self, rows):
+        """Delete the files and records for (id, original, processed) rows"""
+        deleted_files = 0
+        
+        files_to_delete = []
+        for processing_id, original_name, processed_name in rows:
+            if original_name:
+                files_to_delete.append(('original', default_storage.path(original_name)))
+            if processed_name:
+                files_to_delete.append(('processed', default_storage.path(processed_name)))
+        
+        # Clean up files
+        results = delete_files(file_path for _, file_path in files_to_delete)
+        with OutputBuffer(self.stdout) as out:
+            for (label, _), (file_path, deleted, error) in zip(files_to_delete, results):
+                if error:
+                    out.write(
+                        self.style.WARNING(f"Failed to delete {label} file: {error}")
+                    )
+                elif deleted:
+                    deleted_files += 1
+                    out.write(f"Deleted {label}: {file_path}")
+        
+        # Delete database records
+        with transaction.atomic():
+            deleted_records, _ = ImageProcessing.objects.filter(
+                id__in=[row[0] for row in rows]
+            ).delete()
+        self.stdout.write(f"Deleted {deleted_records} record(s)")
+        
+        return deleted_files, deleted_records
+    
     def _cleanup_empty_dirs(self, dry_run):
         """Remove empty upload and processed directories"""
         from django.conf import settings
@@ -5,11 +5,26 @@ This is important for Render.com as they have disk space limitations
 
 import os
 import time
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.utils import timezone
 from remover.models import ImageProcessing
+from remover.utils import OutputBuffer, delete_files
+
+
+def _iter_files(root):
+    """Recursively yield DirEntry objects for the regular files under root"""
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_files(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    except OSError:
+        # Unreadable directories are skipped, as os.walk would
+        return
 
 
 class Command(BaseCommand):
@@ -88,24 +103,23 @@ class Command(BaseCommand):
             
             if not dry_run:
                 # Delete files associated with records before deleting records
-                for record in old_records:
-                    if record.original_image and os.path.exists(record.original_image.path):
-                        try:
-                            os.remove(record.original_image.path)
-                            self.stdout.write(f'Deleted: {record.original_image.path}')
-                        except OSError as e:
-                            self.stdout.write(
-                                self.style.ERROR(f'Error deleting {record.original_image.path}: {e}')
-                            )
-                    
-                    if record.processed_image and os.path.exists(record.processed_image.path):
-                        try:
-                            os.remove(record.processed_image.path)
-                            self.stdout.write(f'Deleted: {record.processed_image.path}')
-                        except OSError as e:
-                            self.stdout.write(
-                                self.style.ERROR(f'Error deleting {record.processed_image.path}: {e}')
+                file_paths = []
+                for record in old_records.only(
+                    'id', 'original_image', 'processed_image'
+                ).iterator(chunk_size=1000):
+                    if record.original_image:
+                        file_paths.append(record.original_image.path)
+                    if record.processed_image:
+                        file_paths.append(record.processed_image.path)
+                
+                with OutputBuffer(self.stdout) as out:
+                    for file_path, deleted, error in delete_files(file_paths):
+                        if error:
+                            out.write(
+                                self.style.ERROR(f'Error deleting {file_path}: {error}')
                             )
+                        elif deleted:
+                            out.write(f'Deleted: {file_path}')
                 
                 old_records.delete()
         
@@ -115,6 +129,7 @@ class Command(BaseCommand):
         """Clean up files not referenced in database"""
         media_root = settings.MEDIA_ROOT
         deleted_count = 0
+        orphaned_files = []
         
         if not os.path.exists(media_root):
             self.stdout.write('Media directory does not exist')
@@ -122,82 +137,93 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Scanning media directory: {media_root}')
         
-        for root, dirs, files in os.walk(media_root):
-            for file in files:
-                file_path = os.path.join(root, file)
-                
-                # Get file modification time
-                try:
-                    file_mtime = datetime.fromtimestamp(
-                        os.path.getmtime(file_path), 
-                        tz=timezone.get_current_timezone()
-                    )
-                except OSError:
-                    continue
-                
-                # Skip if file is not old enough
-                if file_mtime >= cutoff_date:
-                    continue
-                
-                # Check if file is referenced in database
-                relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT)
-                
-                is_referenced = ImageProcessing.objects.filter(
-                    models.Q(original_image=relative_path) |
-                    models.Q(processed_image=relative_path)
-                ).exists()
-                
-                if not is_referenced:
-                    if dry_run:
-                        self.stdout.write(f'Would delete orphaned file: {file_path}')
-                        deleted_count += 1
-                    else:
-                        try:
-                            if force or self.confirm_deletion(file_path):
-                                os.remove(file_path)
-                                self.stdout.write(f'Deleted orphaned file: {file_path}')
-                                deleted_count += 1
-                        except OSError as e:
-                            self.stdout.write(
-                                self.style.ERROR(f'Error deleting {file_path}: {e}')
-                            )
+        # Load every referenced path once and test membership in memory,
+        # rather than querying the database for each file on disk
+        referenced = set()
+        for original_name, processed_name in ImageProcessing.objects.values_list(
+            'original_image', 'processed_image'
+        ).iterator(chunk_size=1000):
+            referenced.add(original_name)
+            if processed_name:
+                referenced.add(processed_name)
+        
+        cutoff_timestamp = cutoff_date.timestamp()
+        out = OutputBuffer(self.stdout)
+        
+        for entry in _iter_files(media_root):
+            file_path = entry.path
+            
+            # Get file modification time (cached from the directory scan)
+            try:
+                file_mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            
+            # Skip if file is not old enough
+            if file_mtime >= cutoff_timestamp:
+                continue
+            
+            # Check if file is referenced in database
+            relative_path = os.path.relpath(file_path, media_root)
+            
+            if relative_path not in referenced:
+                if dry_run:
+                    out.write(f'Would delete orphaned file: {file_path}')
+                    deleted_count += 1
+                elif force or self.confirm_deletion(file_path):
+                    orphaned_files.append(file_path)
+        
+        for file_path, deleted, error in delete_files(orphaned_files):
+            if error:
+                out.write(
+                    self.style.ERROR(f'Error deleting {file_path}: {error}')
+                )
+            elif deleted:
+                out.write(f'Deleted orphaned file: {file_path}')
+                deleted_count += 1
+        
+        out.flush()
         
         return deleted_count
 
     def cleanup_empty_directories(self, dry_run):
         """Remove empty directories in media root"""
-        media_root = settings.MEDIA_ROOT
+        media_root = os.fspath(settings.MEDIA_ROOT)
         cleaned_count = 0
         
         if not os.path.exists(media_root):
             return 0
         
-        # Walk directories in reverse order (deepest first)
+        out = OutputBuffer(self.stdout)
+        removed = set()
+        
+        # Walk directories in reverse order (deepest first), so a directory's
+        # children have already been handled and emptiness is known from the
+        # walk's own listing without reading the directory again
         for root, dirs, files in os.walk(media_root, topdown=False):
-            for dir_name in dirs:
-                dir_path = os.path.join(root, dir_name)
-                
+            if root == media_root:
+                continue
+            
+            if files or not all(os.path.join(root, d) in removed for d in dirs):
+                continue
+            
+            if dry_run:
+                out.write(f'Would remove empty directory: {root}')
+            else:
                 try:
-                    # Check if directory is empty
-                    if not os.listdir(dir_path):
-                        if dry_run:
-                            self.stdout.write(f'Would remove empty directory: {dir_path}')
-                            cleaned_count += 1
-                        else:
-                            os.rmdir(dir_path)
-                            self.stdout.write(f'Removed empty directory: {dir_path}')
-                            cleaned_count += 1
+                    os.rmdir(root)
                 except OSError:
                     # Directory might not be empty or might have permission issues
-                    pass
+                    continue
+                out.write(f'Removed empty directory: {root}')
+            
+            removed.add(root)
+            cleaned_count += 1
         
+        out.flush()
         return cleaned_count
 
     def confirm_deletion(self, file_path):
         """Ask for confirmation before deleting a file"""
         response = input(f'Delete {file_path}? (y/N): ')
         return response.lower() == 'y'
-
-
-# Import models at the end to avoid circular imports
-from django.db import models
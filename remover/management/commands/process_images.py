@@ -0,0 +1,108 @@
+"""
+Management command that runs background removal outside the web process
+Use together with BACKGROUND_REMOVAL_WORKER=True so uploads are queued
+instead of being processed inside the request.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from remover.services import get_ai_service
+from remover.tasks import (
+    STALE_PROCESSING_MINUTES, claim_next_pending, fail_stale_processing, run_bg_removal
+)
+
+# Seconds between sweeps for records abandoned by a dead worker
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Process pending image uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the pending queue once and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between checks when the queue is empty (default: 1)',
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=STALE_PROCESSING_MINUTES,
+            help='Fail records stuck in processing for longer than this '
+                 f'(default: {STALE_PROCESSING_MINUTES})',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        poll_interval = options['poll_interval']
+        stale_minutes = options['stale_minutes']
+
+        # One service for the worker's lifetime, so the model stays loaded
+        ai_service = get_ai_service()
+        self.stdout.write(
+            self.style.SUCCESS(f'Worker started (method: {ai_service.method})')
+        )
+
+        next_stale_check = 0
+        while True:
+            # Drop connections the database closed (restart, idle timeout)
+            # or that outlived CONN_MAX_AGE, as Django does per request
+            close_old_connections()
+
+            try:
+                if time.monotonic() >= next_stale_check:
+                    failed = fail_stale_processing(stale_minutes)
+                    if failed:
+                        self.stdout.write(
+                            self.style.WARNING(f'Marked {failed} stuck record(s) as failed')
+                        )
+                    next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+
+                processing = claim_next_pending()
+            except DatabaseError as e:
+                if once:
+                    raise
+                # Keep polling; the next iteration reconnects
+                self.stdout.write(self.style.ERROR(f'Database error: {e}'))
+                time.sleep(poll_interval)
+                continue
+
+            if processing is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f'Processing {processing.id}...')
+            try:
+                run_bg_removal(processing, ai_service)
+            except Exception as e:
+                # Keep the worker alive and don't leave the record stuck
+                self.stdout.write(self.style.ERROR(f'Unexpected error for {processing.id}: {e}'))
+                processing.status = 'failed'
+                processing.error_message = 'An unexpected error occurred'
+                # Inference can outlast the connection, which may be why the
+                # job failed; reconnect before recording the failure
+                close_old_connections()
+                try:
+                    processing.save(update_fields=['status', 'error_message', 'updated_at'])
+                except DatabaseError as db_error:
+                    # Left in 'processing'; the stale sweep fails it later
+                    self.stdout.write(
+                        self.style.ERROR(f'Could not mark {processing.id} as failed: {db_error}')
+                    )
+                continue
+
+            if processing.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f'Completed {processing.id}'))
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f'Failed {processing.id}: {processing.error_message}')
+                )
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:00
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_expires_at(apps, schema_editor):
+    ImageProcessing = apps.get_model('remover', 'ImageProcessing')
+    ImageProcessing.objects.filter(expires_at__isnull=True).update(
+        expires_at=F('created_at') + datetime.timedelta(hours=24)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('remover', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageprocessing',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:30
+
+from django.db import migrations, models
+
+
+def backfill_display_fields(apps, schema_editor):
+    ImageProcessing = apps.get_model('remover', 'ImageProcessing')
+    batch = []
+    for processing in ImageProcessing.objects.iterator(chunk_size=1000):
+        if processing.original_width and processing.original_height:
+            processing.display_size = f"{processing.original_width}×{processing.original_height}px"
+        if processing.processed_at and processing.created_at:
+            duration = (processing.processed_at - processing.created_at).total_seconds()
+            if duration:
+                processing.display_duration = f"{duration:.1f}s"
+        batch.append(processing)
+        if len(batch) >= 1000:
+            ImageProcessing.objects.bulk_update(batch, ['display_size', 'display_duration'])
+            batch = []
+    if batch:
+        ImageProcessing.objects.bulk_update(batch, ['display_size', 'display_duration'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('remover', '0002_imageprocessing_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageprocessing',
+            name='display_size',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Size'),
+        ),
+        migrations.AddField(
+            model_name='imageprocessing',
+            name='display_duration',
+            field=models.CharField(blank=True, max_length=16, verbose_name='Processing Time'),
+        ),
+        migrations.RunPython(backfill_display_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('remover', '0003_imageprocessing_display_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='imageprocessing',
+            index=models.Index(fields=['status', '-created_at'], name='remover_ima_status_created_idx'),
+        ),
+    ]
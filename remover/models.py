@@ -1,25 +1,49 @@
 import os
+import secrets
 import uuid
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
-from PIL import Image
+from PIL import ImageFile
+
+# How long uploads and results are kept before cleanup removes them
+FILE_RETENTION_HOURS = 24
 
 
 def upload_to_uploads(instance, filename):
     """Generate unique filename for uploaded images"""
-    ext = filename.split('.')[-1]
-    filename = f"{uuid.uuid4().hex}.{ext}"
+    ext = os.path.splitext(filename)[1]
+    filename = f"{secrets.token_hex(12)}{ext}"
     return os.path.join('uploads', filename)
 
 
 def upload_to_processed(instance, filename):
     """Generate unique filename for processed images"""
-    ext = filename.split('.')[-1]
-    filename = f"{uuid.uuid4().hex}_processed.{ext}"
+    ext = os.path.splitext(filename)[1]
+    filename = f"{secrets.token_hex(12)}_processed{ext}"
     return os.path.join('processed', filename)
 
 
+def read_image_dimensions(image_file, chunk_size=4096, max_bytes=None):
+    """
+    Read (width, height) from an image's header without decoding it
+    
+    Works on uncommitted uploads as well as stored files, and usually
+    reads only the first chunk. Gives up with None once max_bytes have
+    been read without finding a header.
+    """
+    parser = ImageFile.Parser()
+    read = 0
+    for chunk in image_file.chunks(chunk_size=chunk_size):
+        parser.feed(chunk)
+        if parser.image is not None:
+            return parser.image.size
+        read += len(chunk)
+        if max_bytes is not None and read >= max_bytes:
+            break
+    return None
+
+
 class ImageProcessing(models.Model):
     """Model to track image processing requests"""
     
@@ -39,14 +63,23 @@ class ImageProcessing(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
     
     # Original image metadata
     original_width = models.PositiveIntegerField(blank=True, null=True)
     original_height = models.PositiveIntegerField(blank=True, null=True)
     original_size = models.PositiveIntegerField(blank=True, null=True)  # in bytes
     
+    # Preformatted values for admin list pages, filled in on save
+    display_size = models.CharField('Size', max_length=32, blank=True)
+    display_duration = models.CharField('Processing Time', max_length=16, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves status filters on the admin list and the worker's pending queue
+            models.Index(fields=['status', '-created_at'], name='remover_ima_status_created_idx'),
+        ]
         verbose_name = 'Image Processing'
         verbose_name_plural = 'Image Processings'
     
@@ -54,18 +87,35 @@ class ImageProcessing(models.Model):
         return f"Processing {self.id} - {self.status}"
     
     def save(self, *args, **kwargs):
-        if self.original_image and not self.original_width:
+        # Status updates pass update_fields; only re-read the image when it changes
+        update_fields = kwargs.get('update_fields')
+        image_changed = update_fields is None or 'original_image' in update_fields
+        
+        if image_changed and self.original_image and not self.original_width:
             # Extract metadata from original image
             try:
-                with Image.open(self.original_image.path) as img:
-                    self.original_width, self.original_height = img.size
+                dimensions = read_image_dimensions(self.original_image)
+                if dimensions:
+                    self.original_width, self.original_height = dimensions
                     self.original_size = self.original_image.size
             except Exception:
                 pass
         
+        if not self.expires_at:
+            self.expires_at = (self.created_at or timezone.now()) + timezone.timedelta(
+                hours=FILE_RETENTION_HOURS
+            )
+        
         if self.status == 'completed' and not self.processed_at:
             self.processed_at = timezone.now()
         
+        if self.original_width and self.original_height:
+            self.display_size = f"{self.original_width}×{self.original_height}px"
+        
+        duration = self.processing_duration
+        if duration:
+            self.display_duration = f"{duration:.1f}s"
+        
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -73,9 +123,9 @@ class ImageProcessing(models.Model):
     
     @property
     def is_expired(self):
-        """Check if the processing request is older than 24 hours"""
-        if self.created_at:
-            return timezone.now() - self.created_at > timezone.timedelta(hours=24)
+        """Check if the processing request has passed its expiry time"""
+        if self.expires_at:
+            return timezone.now() > self.expires_at
         return False
     
     @property
@@ -88,13 +138,13 @@ class ImageProcessing(models.Model):
     def cleanup_files(self):
         """Clean up associated files"""
         try:
-            if self.original_image and os.path.exists(self.original_image.path):
-                os.remove(self.original_image.path)
+            if self.original_image:
+                os.unlink(self.original_image.path)
         except Exception:
             pass
             
         try:
-            if self.processed_image and os.path.exists(self.processed_image.path):
-                os.remove(self.processed_image.path)
+            if self.processed_image:
+                os.unlink(self.processed_image.path)
         except Exception:
             pass
@@ -1,8 +1,12 @@
 import logging
 import os
+import threading
+from functools import lru_cache
 from typing import Optional
-from django.core.files.base import ContentFile
-from PIL import Image
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile, File
+from PIL import Image, ImageOps
 import io
 import numpy as np
 
@@ -20,8 +24,132 @@ try:
 except ImportError:
     CV2_AVAILABLE = False
 
+# Try to import numba for the compiled colour-distance kernel
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# rembg sessions hold the loaded ONNX model, so build one per process and reuse it
+_rembg_session = None
+_rembg_session_lock = threading.Lock()
+
+# Set when REMBG_MODEL_PATH fails to load, so the failure is reported on each
+# request without trying to load the model again
+_rembg_model_error = None
+
+# zlib level for result PNGs. Encoding at the default level 6 is one of the
+# largest CPU costs after inference; level 1 is several times faster for a
+# modestly larger file.
+PNG_COMPRESS_LEVEL = 1
+
+# Largest image handed to rembg for mask prediction; the mask is upscaled
+# to the processing size afterwards
+REMBG_MASK_MAX_SIZE = (1024, 1024)
+
+# Preferred ONNX Runtime execution providers, fastest first
+ONNX_PROVIDERS = ['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider']
+
+
+def _configure_tensorrt():
+    """
+    Enable FP16 TensorRT engines, cached on disk when configured
+    
+    rembg hands only provider names to ONNX Runtime, never provider options,
+    so the settings go through ONNX Runtime's environment variables. Values
+    already set in the environment win.
+    """
+    os.environ.setdefault('ORT_TENSORRT_FP16_ENABLE', '1')
+    if settings.ONNX_TRT_ENGINE_CACHE_PATH:
+        # Building an engine takes minutes; reuse it across restarts
+        os.environ.setdefault('ORT_TENSORRT_ENGINE_CACHE_ENABLE', '1')
+        os.environ.setdefault('ORT_TENSORRT_CACHE_PATH', settings.ONNX_TRT_ENGINE_CACHE_PATH)
+
+
+def _get_onnx_providers():
+    """Return the preferred execution providers this ONNX Runtime build supports"""
+    try:
+        import onnxruntime
+    except ImportError:
+        return None
+    
+    available = onnxruntime.get_available_providers()
+    providers = [provider for provider in ONNX_PROVIDERS if provider in available]
+    if 'TensorrtExecutionProvider' in providers:
+        _configure_tensorrt()
+    return providers or None
+
+
+def get_rembg_session():
+    """Return the shared u2net session, loading the model on first use"""
+    global _rembg_session, _rembg_model_error
+    
+    if _rembg_session is None:
+        with _rembg_session_lock:
+            if _rembg_session is None:
+                model_path = settings.REMBG_MODEL_PATH
+                if model_path:
+                    if _rembg_model_error:
+                        raise ImproperlyConfigured(_rembg_model_error)
+                    
+                    # e.g. an INT8 model produced by the quantize_model command
+                    logger.info(f"Loading rembg model from {model_path}")
+                    try:
+                        _rembg_session = new_session(
+                            'u2net_custom', model_path=model_path, providers=_get_onnx_providers()
+                        )
+                    except Exception as e:
+                        # A broken configured model is a deployment error; don't
+                        # hide it behind the OpenCV fallback
+                        _rembg_model_error = f"REMBG_MODEL_PATH {model_path} could not be loaded: {e}"
+                        logger.error(_rembg_model_error)
+                        raise ImproperlyConfigured(_rembg_model_error) from e
+                else:
+                    logger.info("Loading rembg u2net model")
+                    _rembg_session = new_session('u2net', providers=_get_onnx_providers())
+                
+                # What ONNX Runtime actually enabled, which may be less than requested
+                logger.info(
+                    f"rembg session providers: {_rembg_session.inner_session.get_providers()}"
+                )
+    
+    return _rembg_session
+
+
+def _encode_png(image: Image.Image) -> File:
+    """
+    Encode an image as PNG into an in-memory file
+    
+    The encoder's buffer is wrapped as-is rather than copied into a
+    ContentFile; storage backends stream it to disk in chunks.
+    """
+    output = io.BytesIO()
+    image.save(output, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    output.seek(0)
+    return File(output, name='processed_image.png')
+
+
+if NUMBA_AVAILABLE:
+    # Serial on purpose: a parallel=True kernel entered from two request
+    # threads at once aborts the process under numba's default workqueue
+    # threading layer, and concurrent requests already use the cores
+    @numba.njit(fastmath=True, cache=True)
+    def _color_distance_mask(data, bg_r, bg_g, bg_b, threshold_sq):
+        """Alpha mask of pixels further than the threshold from the background colour"""
+        # One fused pass over the pixels: no int32 copy or distance array
+        h, w = data.shape[0], data.shape[1]
+        mask = np.empty((h, w), dtype=np.uint8)
+        for i in range(h):
+            for j in range(w):
+                dr = np.int32(data[i, j, 0]) - bg_r
+                dg = np.int32(data[i, j, 1]) - bg_g
+                db = np.int32(data[i, j, 2]) - bg_b
+                mask[i, j] = 255 if dr * dr + dg * dg + db * db > threshold_sq else 0
+        return mask
+
 
 class BackgroundRemovalError(Exception):
     """Custom exception for background removal errors"""
@@ -44,7 +172,7 @@ class LocalBackgroundRemover:
         else:
             return "pillow"
     
-    def remove_background(self, image_path: str) -> Optional[ContentFile]:
+    def remove_background(self, image_path: str) -> Optional[File]:
         """
         Remove background from image using local Python libraries
         
@@ -52,77 +180,80 @@ class LocalBackgroundRemover:
             image_path: Path to the image file
             
         Returns:
-            ContentFile with processed image or None if failed
+            File with processed PNG image or None if failed
             
         Raises:
             BackgroundRemovalError: If processing fails
         """
         try:
-            # Optimize image if too large
-            optimized_path = BackgroundProcessor.optimize_image_for_processing(image_path)
+            # Decode once, downscaling if too large, and hand the image to the
+            # selected method in memory
+            image = BackgroundProcessor.prepare_image_for_processing(image_path)
             
             if self.method == "rembg":
-                return self._remove_with_rembg(optimized_path)
+                return self._remove_with_rembg(image)
             elif self.method == "opencv":
-                return self._remove_with_opencv(optimized_path)
+                return self._remove_with_opencv(image)
             else:
-                return self._remove_with_pillow(optimized_path)
+                return self._remove_with_pillow(image)
                 
         except FileNotFoundError:
             raise BackgroundRemovalError("Image file not found")
         except Exception as e:
             logger.error(f"Unexpected error in background removal: {str(e)}")
             raise BackgroundRemovalError(f"Processing error: {str(e)}")
-        finally:
-            # Clean up optimized file if it was created
-            if 'optimized_path' in locals() and optimized_path != image_path:
-                try:
-                    os.remove(optimized_path)
-                except:
-                    pass
     
-    def _remove_with_rembg(self, image_path: str) -> ContentFile:
+    def _remove_with_rembg(self, image: Image.Image) -> File:
         """Remove background using rembg library (AI-based)"""
         logger.info("Processing image with rembg (AI-based method)")
         
         try:
-            # Read the input image
-            with open(image_path, 'rb') as input_file:
-                input_data = input_file.read()
+            # Reuse the loaded model across requests
+            session = get_rembg_session()
             
-            # Create a new session for better performance
-            session = new_session('u2net')
+            # u2net predicts at 320x320 whatever it is given, so run it on a
+            # smaller copy and scale only the mask back up to full size
+            small = image
+            if image.width > REMBG_MASK_MAX_SIZE[0] or image.height > REMBG_MASK_MAX_SIZE[1]:
+                small = image.copy()
+                small.thumbnail(REMBG_MASK_MAX_SIZE, Image.Resampling.BILINEAR)
             
-            # Remove background
-            output_data = remove(input_data, session=session)
+            # rembg returns an 'L' mask image for PIL input with only_mask
+            mask = remove(small, session=session, only_mask=True)
+            if mask.size != image.size:
+                mask = mask.resize(image.size, Image.Resampling.BILINEAR)
             
-            # Create ContentFile
-            processed_image = ContentFile(output_data)
-            processed_image.name = 'processed_image.png'
+            # Cut out the full-resolution image, as rembg's own cutout does
+            rgba = image if image.mode == 'RGBA' else image.convert('RGBA')
+            result_img = Image.composite(rgba, Image.new('RGBA', image.size, 0), mask)
+            
+            # Encode to an in-memory PNG file
+            processed_image = _encode_png(result_img)
             
             logger.info("Background removal with rembg completed successfully")
             return processed_image
             
+        except ImproperlyConfigured:
+            # The configured model can't be used: fail instead of falling back
+            raise
         except Exception as e:
             logger.error(f"rembg processing failed: {str(e)}")
             # Fallback to OpenCV method
             if CV2_AVAILABLE:
-                return self._remove_with_opencv(image_path)
+                return self._remove_with_opencv(image)
             else:
-                return self._remove_with_pillow(image_path)
+                return self._remove_with_pillow(image)
     
-    def _remove_with_opencv(self, image_path: str) -> ContentFile:
+    def _remove_with_opencv(self, image: Image.Image) -> File:
         """Remove background using OpenCV (edge detection + masking)"""
         logger.info("Processing image with OpenCV (edge detection method)")
         
         try:
-            # Read image
-            img = cv2.imread(image_path)
-            if img is None:
-                raise BackgroundRemovalError("Could not read image file")
+            # Work on the decoded pixels directly (RGB channel order)
+            img = np.asarray(image.convert('RGB'))
             
             # Convert to different color spaces for better processing
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
             
             # Apply Gaussian blur to reduce noise
             blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -138,28 +269,19 @@ class LocalBackgroundRemover:
             if contours:
                 # Find the largest contour
                 largest_contour = max(contours, key=cv2.contourArea)
-                cv2.fillPoly(mask, [largest_contour], 255)
+                cv2.drawContours(mask, [largest_contour], -1, 255, thickness=cv2.FILLED)
                 
-                # Smooth the mask
-                mask = cv2.GaussianBlur(mask, (5, 5), 0)
-            
-            # Convert original image to RGBA
-            img_rgba = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+                # Soften the mask edge (a box filter is cheaper than a Gaussian)
+                mask = cv2.boxFilter(mask, -1, (3, 3))
             
-            # Apply mask to alpha channel
-            img_rgba[:, :, 3] = mask
+            # Stack the mask on as the alpha channel in a single allocation
+            img_rgba = np.dstack((img, mask))
             
             # Convert to PIL Image
             pil_image = Image.fromarray(img_rgba, 'RGBA')
             
-            # Save to bytes
-            output = io.BytesIO()
-            pil_image.save(output, format='PNG')
-            output.seek(0)
-            
-            # Create ContentFile
-            processed_image = ContentFile(output.getvalue())
-            processed_image.name = 'processed_image.png'
+            # Encode to an in-memory PNG file
+            processed_image = _encode_png(pil_image)
             
             logger.info("Background removal with OpenCV completed successfully")
             return processed_image
@@ -167,81 +289,75 @@ class LocalBackgroundRemover:
         except Exception as e:
             logger.error(f"OpenCV processing failed: {str(e)}")
             # Fallback to Pillow method
-            return self._remove_with_pillow(image_path)
+            return self._remove_with_pillow(image)
     
-    def _remove_with_pillow(self, image_path: str) -> ContentFile:
+    def _remove_with_pillow(self, image: Image.Image) -> File:
         """Remove background using PIL/Pillow (simple color-based method)"""
         logger.info("Processing image with Pillow (color-based method)")
         
         try:
-            # Open image with PIL
-            with Image.open(image_path) as img:
-                # Convert to RGBA if not already
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                
-                # Get image data
-                data = np.array(img)
-                
-                # Simple background removal based on corner colors
-                # Assume corners contain background color
-                h, w = data.shape[:2]
-                
-                # Sample corner colors
-                corner_colors = [
-                    data[0, 0][:3],      # Top-left
-                    data[0, w-1][:3],    # Top-right
-                    data[h-1, 0][:3],    # Bottom-left
-                    data[h-1, w-1][:3]   # Bottom-right
-                ]
-                
-                # Find the most common corner color (likely background)
-                from collections import Counter
-                corner_tuples = [tuple(color) for color in corner_colors]
-                most_common_bg = Counter(corner_tuples).most_common(1)[0][0]
-                
-                # Create mask for pixels similar to background color
-                bg_color = np.array(most_common_bg)
-                
-                # Calculate color difference
-                color_diff = np.sqrt(np.sum((data[:, :, :3] - bg_color) ** 2, axis=2))
-                
-                # Set threshold for background detection
-                threshold = 50  # Adjust this value for sensitivity
-                
-                # Create alpha mask
-                alpha_mask = (color_diff > threshold).astype(np.uint8) * 255
-                
-                # Apply some morphological operations to clean up the mask
-                try:
-                    if CV2_AVAILABLE:
-                        # Use OpenCV for better morphological operations
-                        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-                        alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_CLOSE, kernel)
-                        alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_OPEN, kernel)
-                        # Apply Gaussian blur to smooth edges
-                        alpha_mask = cv2.GaussianBlur(alpha_mask, (3, 3), 0)
-                except:
-                    pass
-                
-                # Apply alpha mask
-                data[:, :, 3] = alpha_mask
-                
-                # Convert back to PIL Image
-                result_img = Image.fromarray(data, 'RGBA')
-                
-                # Save to bytes
-                output = io.BytesIO()
-                result_img.save(output, format='PNG')
-                output.seek(0)
-                
-                # Create ContentFile
-                processed_image = ContentFile(output.getvalue())
-                processed_image.name = 'processed_image.png'
-                
-                logger.info("Background removal with Pillow completed successfully")
-                return processed_image
+            # Prepared images are already RGB or RGBA; only convert anything else
+            img = image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA')
+            
+            # Simple background removal based on corner colors
+            # Assume corners contain background color
+            w, h = img.size
+            
+            # Sample corner colors straight from the image, no array needed yet
+            corner_colors = [
+                img.getpixel((0, 0))[:3],          # Top-left
+                img.getpixel((w - 1, 0))[:3],      # Top-right
+                img.getpixel((0, h - 1))[:3],      # Bottom-left
+                img.getpixel((w - 1, h - 1))[:3]   # Bottom-right
+            ]
+            
+            # Find the most common corner color (likely background)
+            from collections import Counter
+            most_common_bg = Counter(corner_colors).most_common(1)[0][0]
+            
+            # Read-only view of the decoded pixels; the result is built separately
+            data = np.asarray(img)
+            
+            # Set threshold for background detection
+            threshold = 50  # Adjust this value for sensitivity
+            
+            # Create alpha mask for pixels unlike the background color
+            # (compare squared distances, no sqrt needed)
+            if NUMBA_AVAILABLE:
+                bg_r, bg_g, bg_b = (int(c) for c in most_common_bg)
+                alpha_mask = _color_distance_mask(data, bg_r, bg_g, bg_b, threshold * threshold)
+            else:
+                bg_color = np.array(most_common_bg, dtype=np.int32)
                 
+                # Calculate squared color difference in integers; int32 holds
+                # 3 * 255**2 and einsum sums the channels without a float temporary
+                diff = data[:, :, :3].astype(np.int32) - bg_color
+                color_diff_sq = np.einsum('ijk,ijk->ij', diff, diff)
+                alpha_mask = (color_diff_sq > threshold * threshold).astype(np.uint8) * 255
+            
+            # Apply some morphological operations to clean up the mask
+            try:
+                if CV2_AVAILABLE:
+                    # Use OpenCV for better morphological operations
+                    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+                    alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_CLOSE, kernel)
+                    alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_OPEN, kernel)
+                    # No extra blur pass: close/open already smooth the mask edges
+            except:
+                pass
+            
+            # Apply alpha mask
+            result = np.dstack((data[:, :, :3], alpha_mask))
+            
+            # Convert back to PIL Image
+            result_img = Image.fromarray(result, 'RGBA')
+            
+            # Encode to an in-memory PNG file
+            processed_image = _encode_png(result_img)
+            
+            logger.info("Background removal with Pillow completed successfully")
+            return processed_image
+            
         except Exception as e:
             logger.error(f"Pillow processing failed: {str(e)}")
             raise BackgroundRemovalError(f"All background removal methods failed: {str(e)}")
@@ -255,6 +371,40 @@ def get_ai_service():
     return LocalBackgroundRemover()
 
 
+@lru_cache(maxsize=256)
+def _parse_bg_color(background_color: str) -> tuple:
+    """Parse 'white', 'black' or a '#rrggbb' hex color into an RGBA tuple"""
+    if background_color == 'white':
+        return (255, 255, 255, 255)
+    elif background_color == 'black':
+        return (0, 0, 0, 255)
+    elif background_color.startswith('#'):
+        # Parse hex color
+        hex_color = background_color.lstrip('#')
+        if len(hex_color) == 6:
+            r = int(hex_color[0:2], 16)
+            g = int(hex_color[2:4], 16)
+            b = int(hex_color[4:6], 16)
+            return (r, g, b, 255)
+        raise ValueError(f"Invalid hex color: {background_color}")
+    # Default to white
+    return (255, 255, 255, 255)
+
+
+@lru_cache(maxsize=4)
+def _load_rgba(image_path: str, mtime: float) -> np.ndarray:
+    """
+    Decode an image to an RGBA array, cached per file
+    
+    The modification time is part of the cache key so a replaced file is
+    decoded again. The array is shared between callers and is read-only.
+    """
+    with Image.open(image_path) as img:
+        rgba = np.array(img.convert('RGBA'))
+    rgba.flags.writeable = False
+    return rgba
+
+
 class BackgroundProcessor:
     """Utility class for processing images with different background options"""
     
@@ -271,88 +421,72 @@ class BackgroundProcessor:
             ContentFile with solid background image
         """
         try:
-            with Image.open(image_path) as img:
-                # Ensure image has transparency
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                
-                # Parse background color
-                if background_color == 'white':
-                    bg_color = (255, 255, 255, 255)
-                elif background_color == 'black':
-                    bg_color = (0, 0, 0, 255)
-                elif background_color.startswith('#'):
-                    # Parse hex color
-                    hex_color = background_color.lstrip('#')
-                    if len(hex_color) == 6:
-                        r = int(hex_color[0:2], 16)
-                        g = int(hex_color[2:4], 16)
-                        b = int(hex_color[4:6], 16)
-                        bg_color = (r, g, b, 255)
-                    else:
-                        raise ValueError(f"Invalid hex color: {background_color}")
-                else:
-                    # Default to white
-                    bg_color = (255, 255, 255, 255)
-                
-                # Create background
-                background = Image.new('RGBA', img.size, bg_color)
-                
-                # Composite the image on the background
-                combined = Image.alpha_composite(background, img)
-                
-                # Convert to RGB for JPEG output
-                final_img = combined.convert('RGB')
-                
-                # Save to bytes
-                output = io.BytesIO()
-                format_type = 'JPEG'
-                final_img.save(output, format=format_type, quality=95, optimize=True)
-                output.seek(0)
-                
-                # Create ContentFile
-                processed_image = ContentFile(output.getvalue())
-                color_name = background_color.replace('#', 'hex_')
-                processed_image.name = f'background_{color_name}.jpg'
-                
-                return processed_image
+            bg_color = _parse_bg_color(background_color)
+            
+            # Decoded pixels are reused across downloads of the same result
+            rgba = _load_rgba(image_path, os.path.getmtime(image_path))
+            
+            # Composite the image on the background in one vectorized pass:
+            # out = bg + (fg - bg) * alpha
+            alpha = rgba[:, :, 3:4].astype(np.float32) * (1 / 255)
+            background = np.array(bg_color[:3], dtype=np.float32)
+            combined = (rgba[:, :, :3] - background) * alpha + background
+            
+            # RGB result for JPEG output
+            final_img = Image.fromarray((combined + 0.5).astype(np.uint8), 'RGB')
+            
+            # Save to bytes
+            output = io.BytesIO()
+            format_type = 'JPEG'
+            final_img.save(output, format=format_type, quality=95, optimize=True)
+            output.seek(0)
+            
+            # Create ContentFile
+            processed_image = ContentFile(output.getvalue())
+            color_name = background_color.replace('#', 'hex_')
+            processed_image.name = f'background_{color_name}.jpg'
+            
+            return processed_image
                 
         except Exception as e:
             logger.error(f"Error adding solid background: {str(e)}")
             raise BackgroundRemovalError(f"Background processing error: {str(e)}")
     
     @staticmethod
-    def optimize_image_for_processing(image_path: str, max_size: tuple = (2000, 2000)) -> str:
+    def prepare_image_for_processing(image_path: str, max_size: tuple = (2000, 2000)) -> Image.Image:
         """
-        Optimize image for processing by resizing if too large
+        Load an image for processing, resizing it if too large
         
         Args:
             image_path: Path to the original image
             max_size: Maximum width/height tuple
             
         Returns:
-            Path to optimized image (same path if no optimization needed)
+            Decoded, upright PIL image in RGB or RGBA mode
         """
-        try:
-            with Image.open(image_path) as img:
-                # Check if image needs resizing
+        with Image.open(image_path) as img:
+            # Check if image needs resizing
+            if img.width > max_size[0] or img.height > max_size[1]:
+                logger.info(f"Resizing large image from {img.width}x{img.height}")
+                
+                # For JPEGs, let libjpeg decode at 1/2, 1/4 or 1/8 scale while
+                # staying at or above max_size; no-op for other formats
+                img.draft('RGB', max_size)
+                
+                # Calculate new size maintaining aspect ratio
                 if img.width > max_size[0] or img.height > max_size[1]:
-                    logger.info(f"Resizing large image from {img.width}x{img.height}")
-                    
-                    # Calculate new size maintaining aspect ratio
                     img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                    
-                    # Save optimized image
-                    optimized_path = image_path.replace('.', '_optimized.')
-                    img.save(optimized_path, optimize=True, quality=95)
-                    
-                    logger.info(f"Image resized to {img.width}x{img.height}")
-                    return optimized_path
                 
-                return image_path
-                
-        except Exception as e:
-            logger.error(f"Error optimizing image: {str(e)}")
-            # Return original path if optimization fails
-            return image_path
-
+                logger.info(f"Image resized to {img.width}x{img.height}")
+            
+            # Apply the EXIF orientation (phone photos) to the pixels and drop
+            # the tag, so every method and rembg's own exif_transpose see the
+            # same upright image
+            ImageOps.exif_transpose(img, in_place=True)
+            
+            if img.mode not in ('RGB', 'RGBA'):
+                return img.convert('RGBA')
+            
+            # Decode fully before the file is closed
+            img.load()
+            return img
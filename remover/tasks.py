@@ -0,0 +1,103 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImageProcessing
+from .services import get_ai_service, BackgroundRemovalError
+
+logger = logging.getLogger(__name__)
+
+# Records left in 'processing' longer than this belong to a worker that died
+STALE_PROCESSING_MINUTES = 15
+
+
+def claim_next_pending():
+    """
+    Mark the oldest pending record as processing and return it
+
+    Returns:
+        The claimed ImageProcessing, or None if nothing is pending
+    """
+    with transaction.atomic():
+        # Workers skip rows another worker has locked instead of queueing on them
+        processing = ImageProcessing.objects.select_for_update(
+            skip_locked=True
+        ).filter(status='pending').order_by('created_at').first()
+
+        if processing is None:
+            return None
+
+        # The status condition still guards the claim on backends without row locks (SQLite)
+        claimed = ImageProcessing.objects.filter(
+            id=processing.id, status='pending'
+        ).update(status='processing', updated_at=timezone.now())
+
+    if not claimed:
+        return None
+
+    processing.status = 'processing'
+    return processing
+
+
+def fail_stale_processing(minutes=STALE_PROCESSING_MINUTES):
+    """
+    Mark records stuck in 'processing' as failed
+    
+    A worker killed mid-job leaves its record in 'processing', where no
+    worker picks it up again and the result page polls forever.
+    
+    Returns:
+        Number of records marked as failed
+    """
+    now = timezone.now()
+    return ImageProcessing.objects.filter(
+        status='processing', updated_at__lt=now - timedelta(minutes=minutes)
+    ).update(
+        status='failed',
+        error_message='Processing was interrupted. Please try again.',
+        updated_at=now,
+    )
+
+
+def run_bg_removal(processing, ai_service=None):
+    """
+    Remove the background for a processing record and store the result
+
+    Args:
+        processing: ImageProcessing instance to process
+        ai_service: Background removal service to reuse (created if omitted)
+
+    Returns:
+        The processing instance with its status set to 'completed' or 'failed'
+    """
+    if processing.status != 'processing':
+        processing.status = 'processing'
+        processing.save(update_fields=['status', 'updated_at'])
+
+    try:
+        ai_service = ai_service or get_ai_service()
+        processed_image = ai_service.remove_background(processing.original_image.path)
+
+        if not processed_image:
+            raise BackgroundRemovalError("No processed image returned")
+
+        # Save processed image
+        processing.processed_image.save(
+            f'processed_{processing.id}.png',
+            processed_image,
+            save=False
+        )
+        processing.status = 'completed'
+        processing.save(update_fields=[
+            'status', 'processed_image', 'processed_at', 'display_duration', 'updated_at',
+        ])
+
+    except BackgroundRemovalError as e:
+        logger.error(f"Background removal failed for {processing.id}: {str(e)}")
+        processing.status = 'failed'
+        processing.error_message = str(e)
+        processing.save(update_fields=['status', 'error_message', 'updated_at'])
+
+    return processing
@@ -1,3 +1,180 @@
-from django.test import TestCase
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import FileResponse, Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from bg_remover.urls import protected_media_serve
+
+from .forms import ImageUploadForm
+from .models import ImageProcessing
+from .tasks import claim_next_pending, fail_stale_processing
+
+
+class ProtectedMediaServeTests(SimpleTestCase):
+    """protected_media_serve must only ever hand out regular files under MEDIA_ROOT"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.base_dir = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.base_dir)
+
+        self.media_root = os.path.join(self.base_dir, 'media')
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'sub'))
+        with open(os.path.join(self.media_root, 'uploads', 'x.png'), 'wb') as f:
+            f.write(b'image data')
+
+        # A file outside MEDIA_ROOT and a symlink inside pointing at it
+        self.secret = os.path.join(self.base_dir, 'secret.txt')
+        with open(self.secret, 'wb') as f:
+            f.write(b'secret')
+        os.symlink(self.secret, os.path.join(self.media_root, 'uploads', 'escape.txt'))
+
+    def serve(self, path):
+        request = self.factory.get('/media/' + path)
+        return protected_media_serve(request, path, document_root=self.media_root)
+
+    def assertNotFound(self, path):
+        for prefix in ('', '/internal_media/'):
+            with self.subTest(path=path, accel_prefix=prefix):
+                with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX=prefix):
+                    with self.assertRaises(Http404):
+                        self.serve(path)
+
+    def test_parent_traversal_is_rejected(self):
+        self.assertNotFound('../secret.txt')
+        self.assertNotFound('uploads/../../secret.txt')
+
+    def test_symlink_escaping_media_root_is_rejected(self):
+        self.assertNotFound('uploads/escape.txt')
+
+    def test_directory_is_rejected(self):
+        self.assertNotFound('uploads')
+        self.assertNotFound('uploads/sub/')
+
+    def test_missing_file_is_rejected(self):
+        self.assertNotFound('uploads/missing.png')
+
+    def test_null_byte_is_rejected(self):
+        self.assertNotFound('uploads/x.png\x00')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='')
+    def test_file_is_served_directly(self):
+        response = self.serve('uploads/x.png')
+        self.addCleanup(response.close)
+
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(b''.join(response.streaming_content), b'image data')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/internal_media/')
+    def test_accel_redirect_carries_resolved_path(self):
+        response = self.serve('uploads/sub/../x.png')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/internal_media/uploads/x.png')
+        self.assertNotIn('Content-Type', response)
+        self.assertEqual(response.content, b'')
+
+
+class ProcessingQueueTests(TestCase):
+    """Claiming pending records and failing abandoned ones"""
+
+    def create_processing(self, status='pending', age_minutes=0):
+        processing = ImageProcessing.objects.create(
+            original_image='uploads/test.png', status=status
+        )
+        # auto_now/auto_now_add overwrite timestamps on save, so backdate with update()
+        timestamp = timezone.now() - timedelta(minutes=age_minutes)
+        ImageProcessing.objects.filter(id=processing.id).update(
+            created_at=timestamp, updated_at=timestamp
+        )
+        return processing
+
+    def test_claims_oldest_pending(self):
+        self.create_processing(age_minutes=1)
+        oldest = self.create_processing(age_minutes=5)
+        self.create_processing(status='processing', age_minutes=10)
+
+        claimed = claim_next_pending()
+
+        self.assertEqual(claimed.id, oldest.id)
+        self.assertEqual(claimed.status, 'processing')
+        oldest.refresh_from_db()
+        self.assertEqual(oldest.status, 'processing')
+
+    def test_returns_none_when_queue_is_empty(self):
+        self.assertIsNone(claim_next_pending())
+
+        self.create_processing(status='completed')
+        self.assertIsNone(claim_next_pending())
+
+    def test_row_is_not_claimed_twice(self):
+        processing = self.create_processing()
+        self.assertEqual(claim_next_pending().id, processing.id)
+        self.assertIsNone(claim_next_pending())
+
+    def test_row_claimed_by_another_worker_is_not_claimed(self):
+        # Without row locks (SQLite) the select can still return a row another
+        # worker has just claimed; the conditional update must then match nothing
+        stale_copy = self.create_processing()
+        ImageProcessing.objects.filter(id=stale_copy.id).update(status='processing')
+
+        with mock.patch.object(ImageProcessing.objects, 'select_for_update') as select_for_update:
+            select_for_update.return_value.filter.return_value.order_by.return_value.first.return_value = stale_copy
+            self.assertIsNone(claim_next_pending())
+
+        stale_copy.refresh_from_db()
+        self.assertEqual(stale_copy.status, 'processing')
+
+    def test_fail_stale_processing_only_fails_stale_rows(self):
+        stale = self.create_processing(status='processing', age_minutes=30)
+        active = self.create_processing(status='processing', age_minutes=1)
+        old_pending = self.create_processing(status='pending', age_minutes=30)
+
+        self.assertEqual(fail_stale_processing(minutes=15), 1)
+
+        stale.refresh_from_db()
+        active.refresh_from_db()
+        old_pending.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+        self.assertEqual(stale.error_message, 'Processing was interrupted. Please try again.')
+        self.assertEqual(active.status, 'processing')
+        self.assertEqual(old_pending.status, 'pending')
+
+
+def png_chunk(chunk_type, data):
+    crc = struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+    return struct.pack('>I', len(data)) + chunk_type + data + crc
+
+
+def png_header(width, height):
+    """Start of a PNG claiming the given size, without the pixel data"""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + png_chunk(b'IHDR', ihdr)
+        + png_chunk(b'IDAT', zlib.compress(b'\x00' * 64))
+    )
+
+
+class ImageUploadFormTests(SimpleTestCase):
+
+    def test_oversized_header_is_rejected_before_verify(self):
+        upload = SimpleUploadedFile('huge.png', png_header(7000, 7000), content_type='image/png')
+
+        with mock.patch('PIL.Image.Image.verify') as verify:
+            form = ImageUploadForm(files={'original_image': upload})
+            self.assertFalse(form.is_valid())
+
+        verify.assert_not_called()
+        self.assertEqual(
+            form.errors['original_image'],
+            ['Image is too large. Maximum size is 6000x6000 pixels.'],
+        )
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Unlinks are dominated by syscall latency on network-mounted media disks,
+# so overlapping them in threads pays off well beyond the CPU count.
+# Threads rather than processes: forking inside management commands is unsafe.
+UNLINK_WORKERS = 16
+
+
+def _remove_file(path):
+    """Remove a single file, returning (deleted, error)"""
+    # A bare unlink is one syscall instead of stat + unlink, and cannot race
+    # with another cleanup removing the file in between.
+    try:
+        os.unlink(path)
+        return True, None
+    except FileNotFoundError:
+        return False, None
+    except OSError as e:
+        return False, e
+
+
+def delete_files(paths, max_workers=UNLINK_WORKERS):
+    """
+    Delete files concurrently
+
+    Args:
+        paths: Iterable of absolute file paths
+        max_workers: Number of threads used to issue the unlinks
+
+    Returns:
+        List of (path, deleted, error) tuples in the same order as paths
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        results = list(executor.map(_remove_file, paths))
+
+    return [(path, deleted, error) for path, (deleted, error) in zip(paths, results)]
+
+
+class OutputBuffer:
+    """
+    Collect per-item command output and write it in chunks
+
+    Management commands can report thousands of files; joining the lines and
+    writing them together avoids a separate write per line.
+    """
+
+    def __init__(self, stream, flush_every=1000):
+        self.stream = stream
+        self.flush_every = flush_every
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.stream.write('\n'.join(self.lines))
+            self.lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
@@ -1,7 +1,9 @@
 import logging
 import os
+from urllib.parse import quote
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
 from django.urls import reverse
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
@@ -12,7 +14,8 @@ from django.core.files.storage import default_storage
 
 from .models import ImageProcessing
 from .forms import ImageUploadForm, BackgroundOptionForm
-from .services import get_ai_service, BackgroundRemovalError, BackgroundProcessor
+from .services import BackgroundProcessor
+from .tasks import run_bg_removal
 
 logger = logging.getLogger(__name__)
 
@@ -96,41 +99,27 @@ def process_image_ajax(request, pk):
                 'redirect_url': reverse('remover:result', kwargs={'pk': processing.id})
             })
         
-        # Update status to processing
-        processing.status = 'processing'
-        processing.save()
+        # A process_images worker picks up pending records; the page polls
+        # status_check until it finishes
+        if settings.BACKGROUND_REMOVAL_WORKER:
+            return JsonResponse({
+                'status': processing.status,
+                'error': processing.error_message
+            })
         
         # Process with AI Service
-        try:
-            ai_service = get_ai_service()
-            processed_image = ai_service.remove_background(processing.original_image.path)
-            
-            if processed_image:
-                # Save processed image
-                processing.processed_image.save(
-                    f'processed_{processing.id}.png',
-                    processed_image,
-                    save=True
-                )
-                processing.status = 'completed'
-                processing.save()
-                
-                return JsonResponse({
-                    'status': 'completed',
-                    'redirect_url': reverse('remover:result', kwargs={'pk': processing.id})
-                })
-            else:
-                raise BackgroundRemovalError("No processed image returned")
-                
-        except BackgroundRemovalError as e:
-            processing.status = 'failed'
-            processing.error_message = str(e)
-            processing.save()
-            
+        run_bg_removal(processing)
+        
+        if processing.status == 'completed':
             return JsonResponse({
-                'status': 'failed',
-                'error': str(e)
+                'status': 'completed',
+                'redirect_url': reverse('remover:result', kwargs={'pk': processing.id})
             })
+        
+        return JsonResponse({
+            'status': 'failed',
+            'error': processing.error_message
+        })
     
     except Exception as e:
         logger.error(f"Unexpected error in image processing: {str(e)}")
@@ -199,11 +188,19 @@ class DownloadView(View):
         
         try:
             if background_type == 'transparent':
-                # Download original processed image (transparent)
-                response = HttpResponse(
-                    processing.processed_image.read(),
-                    content_type='image/png'
-                )
+                # Download original processed image (transparent) without
+                # reading it into Python: nginx sends it when X-Accel-Redirect
+                # is configured, otherwise the WSGI server's sendfile path does
+                if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+                    response = HttpResponse(content_type='image/png')
+                    response['X-Accel-Redirect'] = (
+                        settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(processing.processed_image.name)
+                    )
+                else:
+                    response = FileResponse(
+                        open(processing.processed_image.path, 'rb'),
+                        content_type='image/png'
+                    )
                 filename = f'removed_background_{processing.id}.png'
                 
             elif background_type in ['white', 'black']:
@@ -4,66 +4,141 @@ Quick test script for the Django Background Remover application.
 This script starts the server and performs basic validation.
 """
 
+import contextlib
+import functools
+import importlib.util
+import io
+import mmap
 import os
+import re
 import sys
-import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
 
+from manage_app import setup_django
+
+# KEY=value lines of a .env file, skipping comments and blank lines
+_ENV_RE = re.compile(rb'^[ \t]*([^#=\s][^=\n]*)=(.*)$', re.M)
+
+# .env keys always shown in full, even if they look sensitive
+_SHOWN_ENV_KEYS = frozenset({'DEBUG', 'ALLOWED_HOSTS', 'BACKGROUND_REMOVAL_METHOD'})
+
+# Packages the application needs, with the names used in the report
+REQUIRED_MODULES = (
+    ('django', 'Django'),
+    ('PIL', 'Pillow (PIL) library'),
+    ('decouple', 'Python-decouple library'),
+)
+
+MEDIA_ROOT = 'media'
+MEDIA_SUBDIRS = ('uploads', 'processed')
+
+def buffered_output(func):
+    """Collect everything func prints and write it to stdout in one call"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buffer.getvalue())
+    return wrapper
+
+def _read_env(env_file):
+    """Yield (key, value) pairs from a .env file, scanning it in place"""
+    with open(env_file, 'rb') as f:
+        # mmap cannot map an empty file
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in _ENV_RE.finditer(data):
+                yield match.group(1).decode().strip(), match.group(2).decode().strip()
+
+def _check_database():
+    """Open a database connection, raising if the database is unreachable"""
+    from django.db import connection
+    try:
+        connection.ensure_connection()
+    finally:
+        # Connections are per thread; don't leave this one open
+        connection.close()
+
+def _ensure_media_dirs():
+    """Create any missing media directories; returns (path, created) pairs"""
+    # One listing of media/ answers both checks instead of a stat per directory
+    try:
+        with os.scandir(MEDIA_ROOT) as entries:
+            existing = {entry.name for entry in entries if entry.is_dir()}
+    except FileNotFoundError:
+        existing = set()
+    
+    results = []
+    for name in MEDIA_SUBDIRS:
+        dir_path = f"{MEDIA_ROOT}/{name}"
+        created = name not in existing
+        if created:
+            os.makedirs(dir_path, exist_ok=True)
+        results.append((dir_path, created))
+    return results
+
+@functools.lru_cache(maxsize=1)
+def _cached_service():
+    """Build the background removal service once per process, with its class name"""
+    from remover.services import get_ai_service
+    service = get_ai_service()
+    return service, type(service).__name__
+
+@buffered_output
 def test_application():
     """Test the basic functionality of the Django application"""
     print("🚀 Starting AI Background Remover Application Test...")
     
-    # Test imports
-    try:
-        import django
-        from django.core.management import execute_from_command_line
-        print("✓ Django imports successful")
-        
-        import requests
-        print("✓ Requests library available")
-        
-        from PIL import Image
-        print("✓ Pillow (PIL) library available")
-        
-        from decouple import config
-        print("✓ Python-decouple library available")
-        
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
+    # Test imports; find_spec answers "is it installed?" without running
+    # the package's __init__. Django is imported for real by setup below.
+    missing = []
+    for module_name, label in REQUIRED_MODULES:
+        if importlib.util.find_spec(module_name) is None:
+            missing.append(module_name)
+            print(f"❌ {label} not installed")
+        else:
+            print(f"✓ {label} available")
+    
+    if missing:
+        print(f"❌ Missing: {', '.join(missing)}")
         print("Please run: pip install -r requirements.txt")
         return False
     
-    # Set Django settings
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bg_remover.settings')
-    
     try:
         # Test Django setup
-        django.setup()
+        setup_django()
         print("✓ Django setup successful")
         
-        # Test database connection
-        from django.db import connection
-        cursor = connection.cursor()
-        print("✓ Database connection successful")
-        
         # Test model imports
         from remover.models import ImageProcessing
         from remover.forms import ImageUploadForm
         from remover.services import get_ai_service
         print("✓ Application models and services loaded")
         
-        # Test media directories exist
-        media_dirs = ['media/uploads', 'media/processed']
-        for dir_path in media_dirs:
-            if os.path.exists(dir_path):
-                print(f"✓ Directory exists: {dir_path}")
-            else:
-                os.makedirs(dir_path, exist_ok=True)
+        # The remaining probes are independent and mostly wait on I/O, so
+        # run them together and report in the usual order
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            database_future = executor.submit(_check_database)
+            media_dirs_future = executor.submit(_ensure_media_dirs)
+            service_future = executor.submit(_cached_service)
+        
+        # Test database connection
+        database_future.result()
+        print("✓ Database connection successful")
+        
+        # Make sure media directories exist
+        for dir_path, created in media_dirs_future.result():
+            if created:
                 print(f"✓ Created directory: {dir_path}")
+            else:
+                print(f"✓ Directory exists: {dir_path}")
         
         # Test local background removal service
-        service = get_ai_service()
-        service_type = type(service).__name__
+        service, service_type = service_future.result()
         print(f"✓ Background removal service initialized: {service_type}")
         print(f"ℹ️  Using method: {service.method}")
         
@@ -84,6 +159,7 @@ def test_application():
         print(f"❌ Error during testing: {e}")
         return False
 
+@buffered_output
 def check_environment():
     """Check environment configuration"""
     print("\n🔧 Environment Check:")
@@ -93,22 +169,17 @@ def check_environment():
         print("✓ .env file exists")
         
         # Read and show non-sensitive config
-        with open(env_file, 'r') as f:
-            lines = f.readlines()
-            
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                key = line.split('=')[0]
-                if key in ['DEBUG', 'ALLOWED_HOSTS', 'BACKGROUND_REMOVAL_METHOD']:
-                    print(f"✓ {line}")
-                elif 'KEY' in key:
-                    print(f"✓ {key}=***hidden***")
-                else:
-                    print(f"✓ {line}")
+        for key, value in _read_env(env_file):
+            if key in _SHOWN_ENV_KEYS:
+                print(f"✓ {key}={value}")
+            elif 'KEY' in key:
+                print(f"✓ {key}=***hidden***")
+            else:
+                print(f"✓ {key}={value}")
     else:
         print("⚠️  .env file not found - using default settings")
     
+@buffered_output
 def show_usage_instructions():
     """Show instructions for using the application"""
     print("\n📖 Usage Instructions:")
@@ -4,20 +4,76 @@ Test script to verify the upload UI functionality
 This script checks if all the UI components are properly configured
 """
 
-import os
+import re
 import sys
-import django
-from django.conf import settings
 from django.test import Client
-from django.urls import reverse
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bg_remover.settings')
-django.setup()
+from manage_app import setup_django
+from test_server import buffered_output
 
+# Setup Django, unless this process already has (e.g. test_server ran first)
+setup_django()
+
+# Required upload page elements: (marker, description for the report)
+_CHECKS = (
+    (b'id="upload-form"', "Upload form is"),
+    (b'id="image-upload"', "File input is"),
+    (b'id="drop-zone"', "Drop zone is"),
+    (b'id="preview-container"', "Preview container is"),
+    (b'handleFiles', "File handling JavaScript is"),
+    (b'handleDragEnter', "Drag and drop handlers are"),
+    (b'showError', "Error handling is"),
+    (b'validateFile', "File validation is"),
+)
+
+# Markers looked for in the upload page, matched in a single scan
+PAGE_MARKERS = tuple(marker for marker, _ in _CHECKS) + (
+    b'dragenter', b'preview-image', b'bg-',
+)
+# Matched case-insensitively and reported in lower case
+PAGE_MARKERS_ANY_CASE = (b'jquery', b'tailwind')
+
+_PAGE_MARKER_RE = re.compile(b'|'.join(
+    [re.escape(marker) for marker in PAGE_MARKERS]
+    + [b'(?i:' + re.escape(marker) + b')' for marker in PAGE_MARKERS_ANY_CASE]
+))
+
+# Bytes carried between chunks so a marker split across them is still seen
+_MARKER_OVERLAP = max(map(len, PAGE_MARKERS + PAGE_MARKERS_ANY_CASE)) - 1
+
+# Shared test client, created on first use
+_CLIENT = None
+
+def _get_client():
+    """Return the shared test client so later requests reuse its warm setup"""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = Client()
+    return _CLIENT
+
+def find_page_markers(chunks):
+    """
+    Return the set of PAGE_MARKERS found in a body and its size in bytes
+    
+    The body is scanned chunk by chunk, so streaming responses are checked
+    as they arrive; a plain response is a single chunk.
+    """
+    found = set()
+    size = 0
+    tail = b''
+    for chunk in chunks:
+        size += len(chunk)
+        data = tail + chunk if tail else chunk
+        for match in _PAGE_MARKER_RE.finditer(data):
+            marker = match.group()
+            found.add(marker if marker in PAGE_MARKERS else marker.lower())
+        tail = data[-_MARKER_OVERLAP:]
+    return found, size
+
+@buffered_output
 def test_upload_page():
     """Test that the upload page loads correctly"""
-    client = Client()
+    client = _get_client()
     
     print("Testing upload page...")
     response = client.get('/')
@@ -26,62 +82,23 @@ def test_upload_page():
         print("[✓] Upload page loads successfully")
         
         # Check for key elements in the HTML
-        content = response.content.decode('utf-8')
-        
-        # Check for upload form
-        if 'id="upload-form"' in content:
-            print("[✓] Upload form is present")
+        # The markers are ASCII, so scan the raw bytes without decoding
+        if response.streaming:
+            chunks = response.streaming_content
         else:
-            print("[✗] Upload form is missing")
-            
-        # Check for file input
-        if 'id="image-upload"' in content:
-            print("[✓] File input is present")
-        else:
-            print("[✗] File input is missing")
-            
-        # Check for drag and drop zone
-        if 'id="drop-zone"' in content:
-            print("[✓] Drop zone is present")
-        else:
-            print("[✗] Drop zone is missing")
-            
-        # Check for preview container
-        if 'id="preview-container"' in content:
-            print("[✓] Preview container is present")
-        else:
-            print("[✗] Preview container is missing")
-            
-        # Check for JavaScript functionality
-        if 'handleFiles' in content:
-            print("[✓] File handling JavaScript is present")
-        else:
-            print("[✗] File handling JavaScript is missing")
-            
-        # Check for drag and drop handlers
-        if 'handleDragEnter' in content:
-            print("[✓] Drag and drop handlers are present")
-        else:
-            print("[✗] Drag and drop handlers are missing")
-            
-        # Check for error handling
-        if 'showError' in content:
-            print("[✓] Error handling is present")
-        else:
-            print("[✗] Error handling is missing")
-            
-        # Check for form validation
-        if 'validateFile' in content:
-            print("[✓] File validation is present")
-        else:
-            print("[✗] File validation is missing")
+            chunks = (response.content,)
+        found, size = find_page_markers(chunks)
+        
+        results = [(name, marker in found) for marker, name in _CHECKS]
+        for name, present in results:
+            print(f"[✓] {name} present" if present else f"[✗] {name} missing")
             
         print("\nPage Content Summary:")
-        print(f"   - Page size: {len(content)} characters")
-        print(f"   - Contains jQuery: {'jquery' in content.lower()}")
-        print(f"   - Contains TailwindCSS classes: {'tailwind' in content.lower() or 'bg-' in content}")
-        print(f"   - Contains drag-and-drop: {'dragenter' in content}")
-        print(f"   - Contains file preview: {'preview-image' in content}")
+        print(f"   - Page size: {size} bytes")
+        print(f"   - Contains jQuery: {b'jquery' in found}")
+        print(f"   - Contains TailwindCSS classes: {b'tailwind' in found or b'bg-' in found}")
+        print(f"   - Contains drag-and-drop: {b'dragenter' in found}")
+        print(f"   - Contains file preview: {b'preview-image' in found}")
         
     else:
         print(f"[✗] Upload page failed to load. Status: {response.status_code}")